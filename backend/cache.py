@@ -0,0 +1,116 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+
+import numpy as np
+
+# 동일한 프롬프트/텍스트에 대한 LLM 응답과 임베딩을 재사용하기 위한 캐시입니다.
+# REDIS_URL이 설정되어 있으면 Redis를, 아니면 프로세스 내 LRU 캐시를 사용합니다.
+CACHE_PREFIX = "interview"
+CACHE_TTL = int(os.environ.get("LLM_CACHE_TTL", "3600"))
+
+
+class MemoryCache:
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: int = CACHE_TTL):
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    async def close(self):
+        self._data.clear()
+
+
+class RedisCache:
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+        self.client = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            return await self.client.get(key)
+        except Exception:
+            # 캐시 장애가 API 요청 실패로 이어지지 않도록 미스로 처리합니다.
+            return None
+
+    async def set(self, key: str, value: bytes, ttl: int = CACHE_TTL):
+        try:
+            await self.client.set(key, value, ex=ttl)
+        except Exception:
+            pass
+
+    async def close(self):
+        await self.client.aclose()
+
+
+_cache = None
+_bypass = ContextVar("cache_bypass", default=False)
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        redis_url = os.environ.get("REDIS_URL")
+        if redis_url:
+            _cache = RedisCache(redis_url)
+        else:
+            _cache = MemoryCache(int(os.environ.get("LLM_CACHE_MAXSIZE", "1024")))
+    return _cache
+
+
+async def close_cache():
+    global _cache
+    if _cache is not None:
+        await _cache.close()
+        _cache = None
+
+
+@contextmanager
+def bypass_cache():
+    # 이 블록 안(및 여기서 만든 태스크)의 LLM 호출은 캐시를 읽지 않고 새 응답으로 갱신합니다.
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def cache_bypassed() -> bool:
+    return _bypass.get()
+
+
+def make_key(kind: str, provider: str, model: str, text: str) -> str:
+    digest = hashlib.sha256(f"{provider}\0{model}\0{text}".encode("utf-8")).hexdigest()
+    return f"{CACHE_PREFIX}:{kind}:{digest}"
+
+
+def encode_embedding(vec: List[float]) -> bytes:
+    # 벡터별 스케일을 둔 int8로 양자화하여 float32 대비 캐시 용량/대역폭을 약 1/4로 줄입니다.
+    a = np.asarray(vec, dtype=np.float32)
+    scale = float(np.abs(a).max()) / 127 if a.size else 0.0
+    q = np.round(a / scale).astype(np.int8) if scale > 0 else np.zeros(a.shape, dtype=np.int8)
+    return np.float32(scale).tobytes() + q.tobytes()
+
+
+def decode_embedding(payload: bytes) -> List[float]:
+    scale = np.frombuffer(payload[:4], dtype=np.float32)[0]
+    return (np.frombuffer(payload[4:], dtype=np.int8).astype(np.float32) * scale).tolist()
@@ -1,4 +1,5 @@
 import os
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -6,12 +7,23 @@ load_dotenv()
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 import routes
+from cache import close_cache, get_cache
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_cache()
+    yield
+    await close_cache()
 
 app = FastAPI(
     title="AI Interview Analyzer API",
     description="LLM-based interview analysis and performance evaluation system",
     version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 app.add_middleware(
@@ -28,4 +40,13 @@ def read_root():
 app.include_router(routes.router)
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8012)
\ No newline at end of file
+    # 워커 프로세스마다 메모리 캐시와 OpenAI 동시성 제한이 따로 적용되므로 필요하면 REDIS_URL로 캐시를 공유하세요.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8012,
+        workers=int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        # uvloop/httptools가 설치되어 있으면 자동으로 사용하고, 없으면(Windows 등) 기본 구현으로 동작합니다.
+        loop="auto",
+        http="auto",
+    )
\ No newline at end of file
@@ -32,4 +32,15 @@ class InterviewResponse(BaseModel):
     transcripts: Optional[List[str]] = None
     reference: Optional[str] = None
     hire_decision: Optional[HireDecision] = None
-    ai_provider: Optional[str] = None
\ No newline at end of file
+    ai_provider: Optional[str] = None
+
+class BatchJobResponse(BaseModel):
+    batch_id: str
+    status: str
+
+class BatchGenerationResponse(BaseModel):
+    batch_id: str
+    status: str
+    question: Optional[str] = None
+    transcripts: Optional[List[str]] = None
+    reference: Optional[str] = None
\ No newline at end of file
@@ -1,12 +1,19 @@
-from fastapi import APIRouter, HTTPException, status, Query
+from functools import lru_cache
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from openai import OpenAIError
 
+from cache import bypass_cache
 from models import (
+    BatchGenerationResponse,
+    BatchJobResponse,
     InterviewAnalysisRequest,
     InterviewGenerationRequest,
     InterviewResponse,
 )
 from services import (
+    BaseAIService,
     EvaluationService,
     InterviewService,
     OpenAIService,
@@ -17,15 +24,28 @@ from services import (
 router = APIRouter(prefix="/interviews", tags=["면접"])
 
 AI_PROVIDERS = {
-    "openai": OpenAIService(),
-    "friendli": FriendliService(),
-    "gemini": GeminiService()
+    "openai": OpenAIService,
+    "friendli": FriendliService,
+    "gemini": GeminiService
 }
 
 
-def get_services(provider_name: str):
+@lru_cache(maxsize=None)
+def _provider(name: str) -> BaseAIService:
+    # 실제로 요청된 제공자만 처음 사용할 때 생성하고 이후에는 같은 인스턴스를 재사용합니다.
+    return AI_PROVIDERS[name]()
+
+
+def get_ai_provider(
+    provider: str = Query("openai", description="사용할 AI 엔진: openai, friendli, gemini")
+) -> BaseAIService:
     # 기본 제공자를 openai로 설정하거나 사용자의 선택에 따름
-    provider = AI_PROVIDERS.get(provider_name.lower(), AI_PROVIDERS["openai"])
+    # 테스트에서는 app.dependency_overrides[get_ai_provider]로 가짜 제공자를 주입할 수 있습니다.
+    name = provider.lower()
+    return _provider(name if name in AI_PROVIDERS else "openai")
+
+
+def get_services(provider: BaseAIService):
     return (
         InterviewService(ai_service=provider),
         EvaluationService(ai_service=provider)
@@ -34,7 +54,8 @@ def get_services(provider_name: str):
 
 @router.post(
     "/generations",
-    response_model=InterviewResponse,
+    # 응답은 서비스 계층에서 검증 없이 조립되므로 FastAPI의 재검증을 생략합니다.
+    response_model=None,
     status_code=status.HTTP_201_CREATED,
     summary="모의 면접 데이터 생성 및 평가 실행",
     description="""
@@ -58,9 +79,11 @@ def get_services(provider_name: str):
 참고:
 - 외부 AI 서비스를 호출하므로 로컬 전용 엔드포인트보다 느릴 수 있습니다.
 - 선택한 제공자의 API 키가 없거나 유효하지 않으면 요청이 실패합니다.
+- 같은 제공자/직무의 생성 결과는 최대 1시간 캐시되며, `nocache=true`로 새로 생성할 수 있습니다.
 """,
     responses={
         201: {
+            "model": InterviewResponse,
             "description": "면접 데이터 생성 및 분석이 성공적으로 완료되었습니다.",
         },
         422: {
@@ -71,18 +94,23 @@ def get_services(provider_name: str):
         },
     },
 )
-def create_interview_data(
+async def create_interview_data(
     req: InterviewGenerationRequest,
-    provider: str = Query("openai", description="사용할 AI 엔진: openai, friendli, gemini")
+    ai: BaseAIService = Depends(get_ai_provider),
+    nocache: bool = Query(False, description="true이면 캐시된 생성 결과를 사용하지 않고 새로 생성")
 ):
-    int_service, eval_service = get_services(provider)
+    int_service, eval_service = get_services(ai)
     try:
         # 1. AI를 통해 질문, 답변셋, 기준 답변 생성
-        generated_data = int_service.generate_content(req.job_position)
+        if nocache:
+            with bypass_cache():
+                generated_data = await int_service.generate_content(req.job_position, use_cache=False)
+        else:
+            generated_data = await int_service.generate_content(req.job_position)
 
         # 2. 생성된 데이터를 평가 서비스로 전달하여 분석 리포트 및 점수 생성
         # 여기서 question 데이터를 명시적으로 넘겨주어야 프론트엔드에서 확인 가능합니다.
-        return eval_service.process_analysis(
+        return await eval_service.process_analysis(
             transcripts=generated_data["transcripts"],
             reference=generated_data["reference"],
             position=req.job_position,
@@ -96,13 +124,14 @@ def create_interview_data(
     except (OpenAIError, Exception) as e:
         raise HTTPException(
             status_code=status.HTTP_502_BAD_GATEWAY,
-            detail=f"{provider}에서 생성/분석 중 오류가 발생했습니다: {str(e)}",
+            detail=f"{ai.get_provider_name()}에서 생성/분석 중 오류가 발생했습니다: {str(e)}",
         )
 
 
 @router.post(
     "/analyses",
-    response_model=InterviewResponse,
+    # 응답은 서비스 계층에서 검증 없이 조립되므로 FastAPI의 재검증을 생략합니다.
+    response_model=None,
     summary="사용자 입력 면접 답변을 기준 답변과 비교 분석",
     description="""
 사용자가 제공한 면접 답변(지원자 답변)을 전문가 기준 답변과 비교하여 평가합니다.
@@ -131,6 +160,7 @@ def create_interview_data(
 """,
     responses={
         200: {
+            "model": InterviewResponse,
             "description": "분석이 성공적으로 완료되었습니다.",
         },
         400: {
@@ -141,9 +171,9 @@ def create_interview_data(
         },
     },
 )
-def analyze_interviews(
+async def analyze_interviews(
     req: InterviewAnalysisRequest,
-    provider: str = Query("openai", description="사용할 AI 엔진: openai, friendli, gemini")
+    ai: BaseAIService = Depends(get_ai_provider)
 ):
     if not req.transcripts:
         raise HTTPException(
@@ -151,9 +181,9 @@ def analyze_interviews(
             detail="최소 하나 이상의 면접 답변이 필요합니다.",
         )
 
-    _, eval_service = get_services(provider)
+    _, eval_service = get_services(ai)
     try:
-        return eval_service.process_analysis(
+        return await eval_service.process_analysis(
             transcripts=req.transcripts,
             reference=req.reference,
         )
@@ -165,5 +195,133 @@ def analyze_interviews(
     except (OpenAIError, Exception) as e:
         raise HTTPException(
             status_code=status.HTTP_502_BAD_GATEWAY,
-            detail=f"{provider}에서 분석 중 오류가 발생했습니다: {str(e)}",
-        )
\ No newline at end of file
+            detail=f"{ai.get_provider_name()}에서 분석 중 오류가 발생했습니다: {str(e)}",
+        )
+
+
+async def _to_sse(chunks, provider: str):
+    # 여러 줄로 된 조각도 SSE 규격에 맞도록 줄마다 data: 접두어를 붙입니다.
+    try:
+        async for chunk in chunks:
+            if chunk:
+                yield "".join(f"data: {line}\n" for line in chunk.split("\n")) + "\n"
+    except (OpenAIError, Exception) as e:
+        yield f"event: error\ndata: {provider}에서 리포트 생성 중 오류가 발생했습니다: {str(e)}\n\n"
+        return
+    yield "event: end\ndata: \n\n"
+
+
+@router.post(
+    "/analyses/stream",
+    summary="교차 분석 리포트를 실시간 스트리밍으로 생성",
+    description="""
+`/interviews/analyses`와 같은 입력을 받아 교차 분석 리포트를 생성하되, 전체 응답을 기다리지 않고
+LLM이 생성하는 토큰을 Server-Sent Events(`text/event-stream`)로 즉시 전달합니다.
+
+참고:
+- 점수 계산과 채용 결정은 포함되지 않으며 리포트 본문만 스트리밍됩니다.
+- 스트림이 끝나면 `end` 이벤트, 생성 중 오류가 발생하면 `error` 이벤트가 전송됩니다.
+""",
+    responses={
+        200: {
+            "description": "리포트 스트림이 시작되었습니다.",
+            "content": {"text/event-stream": {}},
+        },
+        400: {
+            "description": "잘못된 요청(예: 면접 답변 누락).",
+        },
+    },
+)
+async def stream_interview_analysis(
+    req: InterviewAnalysisRequest,
+    ai: BaseAIService = Depends(get_ai_provider)
+):
+    if not req.transcripts:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="최소 하나 이상의 면접 답변이 필요합니다.",
+        )
+
+    _, eval_service = get_services(ai)
+    return StreamingResponse(
+        _to_sse(eval_service.astream_report(req.transcripts, req.reference), ai.get_provider_name()),
+        media_type="text/event-stream",
+    )
+
+
+@router.post(
+    "/generations/batch",
+    response_model=BatchJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="OpenAI Batch API로 모의 면접 데이터 생성 예약",
+    description="""
+`/interviews/generations`의 면접 데이터 생성 요청을 OpenAI Batch API에 제출하고 배치 ID를 즉시 반환합니다.
+
+사용 예:
+- CI나 스크립트로 데모 데이터를 대량 생성할 때처럼 지연보다 비용이 중요한 경우(Batch API는 약 50% 저렴)
+
+참고:
+- OpenAI 제공자만 지원하며 처리는 최대 24시간이 걸릴 수 있습니다.
+- 결과는 `GET /interviews/batch/{batch_id}`로 조회하고, 평가는 `/interviews/analyses`로 수행합니다.
+""",
+    responses={
+        202: {
+            "description": "배치 작업이 제출되었습니다.",
+        },
+        502: {
+            "description": "배치 제출 중 상위 AI 제공자 오류가 발생했습니다.",
+        },
+    },
+)
+async def create_interview_data_batch(req: InterviewGenerationRequest):
+    ai = _provider("openai")
+    int_service = InterviewService(ai_service=ai)
+    try:
+        # 조회 시 기본 문구에 쓸 수 있도록 직무명을 배치 메타데이터에 함께 저장합니다.
+        batch_id = await ai.submit_batch(
+            [int_service.build_prompt(req.job_position)],
+            metadata={"job_position": req.job_position},
+        )
+    except (OpenAIError, Exception) as e:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"openai 배치 제출 중 오류가 발생했습니다: {str(e)}",
+        )
+    return BatchJobResponse(batch_id=batch_id, status="submitted")
+
+
+@router.get(
+    "/batch/{batch_id}",
+    response_model=BatchGenerationResponse,
+    summary="Batch API 면접 데이터 생성 결과 조회",
+    description="""
+`/interviews/generations/batch`로 제출한 배치의 상태를 조회합니다.
+배치가 완료되면 생성된 질문, 지원자 답변, 기준 답변을 함께 반환합니다.
+""",
+    responses={
+        200: {
+            "description": "배치 상태를 조회했습니다.",
+        },
+        502: {
+            "description": "배치 조회 중 상위 AI 제공자 오류가 발생했습니다.",
+        },
+    },
+)
+async def get_interview_data_batch(batch_id: str):
+    ai = _provider("openai")
+    try:
+        result = await ai.retrieve_batch(batch_id)
+    except (OpenAIError, Exception) as e:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"openai 배치 조회 중 오류가 발생했습니다: {str(e)}",
+        )
+
+    response = BatchGenerationResponse(batch_id=result["batch_id"], status=result["status"])
+    if result["outputs"] and result["outputs"][0] is not None:
+        job_position = result["metadata"].get("job_position", InterviewGenerationRequest().job_position)
+        generated = InterviewService(ai_service=ai).parse_content(result["outputs"][0], job_position)
+        response.question = generated["question"]
+        response.transcripts = generated["transcripts"]
+        response.reference = generated["reference"]
+    return response
\ No newline at end of file
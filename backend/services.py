@@ -1,44 +1,233 @@
+import asyncio
+import json
 import os
 import re
+import time
 from abc import ABC, abstractmethod
-from typing import List
-from openai import OpenAI
-from models import CandidateScore, HireDecision
+from collections import Counter
+from functools import lru_cache
+from typing import AsyncIterator, List, Optional
+import numpy as np
+import orjson
+from async_lru import alru_cache
+from openai import APIConnectionError, APITimeoutError, AsyncOpenAI, InternalServerError, RateLimitError
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+from cache import cache_bypassed, decode_embedding, encode_embedding, get_cache, make_key
+from models import CandidateScore, HireDecision, InterviewResponse
+
+_WORD_RE = re.compile(r"\w+")
+
+# 생성 결과의 한글 섹션 태그를 한 번의 split으로 나누는 정규표현식입니다.
+_SECTION_RE = re.compile(r"\[(질문|면접자 1|면접자 2|면접자 3|모범답안)\]")
+
+def _parse_sections(raw_text: str) -> dict:
+    parts = _SECTION_RE.split(raw_text)
+    sections = {}
+    # parts = [머리말, 태그, 본문, 태그, 본문, ...] 형태이므로 태그/본문 쌍으로 순회합니다.
+    for label, body in zip(parts[1::2], parts[2::2]):
+        sections.setdefault(label, body.strip())
+    return sections
+
+class TokenBucket:
+    """분당 한도만큼 연속적으로 채워지는 토큰 버킷입니다."""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = float(rate_per_minute)
+        self.tokens = self.capacity
+        self.rate = self.capacity / 60.0
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: float = 1.0):
+        amount = min(float(amount), self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+# 동시 요청 수와 분당 요청/토큰 수를 미리 제한하여 429 재시도 폭주를 막습니다.
+_OPENAI_SEM = asyncio.Semaphore(int(os.environ.get("OPENAI_MAX_CONCURRENCY", "16")))
+_OPENAI_REQUEST_BUCKET = TokenBucket(float(os.environ.get("OPENAI_RPM", "500")))
+_OPENAI_TOKEN_BUCKET = TokenBucket(float(os.environ.get("OPENAI_TPM", "200000")))
+
+def _estimate_tokens(*texts: str) -> int:
+    # 한국어/영어 혼용 텍스트에 대한 보수적인 토큰 추정치입니다.
+    return max(1, sum(len(t) for t in texts) // 2)
+
+# SDK 자체 재시도를 끈 대신 429, 연결 오류, 타임아웃, 5xx를 모두 여기서 재시도합니다.
+_retry_transient = retry(
+    wait=wait_random_exponential(min=1, max=20),
+    stop=stop_after_attempt(6),
+    retry=retry_if_exception_type((RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)),
+    reraise=True,
+)
+
+@_retry_transient
+async def _call_openai(create, est_tokens: int, **kwargs):
+    await _OPENAI_REQUEST_BUCKET.acquire(1)
+    await _OPENAI_TOKEN_BUCKET.acquire(est_tokens)
+    async with _OPENAI_SEM:
+        return await create(**kwargs)
+
+@_retry_transient
+async def _open_openai_stream(create, est_tokens: int, **kwargs):
+    # 스트림은 끝까지 소비될 때까지 동시성 슬롯을 점유하므로, 성공 시 호출자가 _OPENAI_SEM을 해제해야 합니다.
+    await _OPENAI_REQUEST_BUCKET.acquire(1)
+    await _OPENAI_TOKEN_BUCKET.acquire(est_tokens)
+    await _OPENAI_SEM.acquire()
+    try:
+        return await create(**kwargs)
+    except BaseException:
+        _OPENAI_SEM.release()
+        raise
+
+@lru_cache(maxsize=None)
+def _shared_openai() -> AsyncOpenAI:
+    # 모든 제공자가 하나의 OpenAI 클라이언트(연결 풀)를 공유하여 TLS 핸드셰이크를 줄입니다.
+    # 재시도는 _retry_transient(tenacity)가 전담하므로 SDK 자체 재시도는 끕니다.
+    return AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY") or "DUMMY_FOR_TESTS", max_retries=0)
 
 class BaseAIService(ABC):
     @abstractmethod
-    def fetch_chat_completion(self, prompt: str) -> str:
+    async def afetch_chat_completion(self, prompt: str, json_mode: bool = False) -> str:
         pass
 
     @abstractmethod
-    def get_embedding(self, text: str) -> List[float]:
+    async def aget_embedding(self, text: str) -> List[float]:
         pass
 
+    async def aget_embeddings(self, texts: List[str]) -> List[List[float]]:
+        # 배치 임베딩을 지원하지 않는 제공자는 개별 요청을 동시에 보냅니다.
+        return list(await asyncio.gather(*[self.aget_embedding(t) for t in texts]))
+
+    async def astream_chat_completion(self, prompt: str) -> AsyncIterator[str]:
+        # 스트리밍을 지원하지 않는 제공자는 전체 응답을 한 번에 내보냅니다.
+        yield await self.afetch_chat_completion(prompt)
+
     @abstractmethod
     def get_provider_name(self) -> str:
         pass
 
 class OpenAIService(BaseAIService):
     def __init__(self):
-        api_key = os.environ.get("OPENAI_API_KEY") or "DUMMY_FOR_TESTS"
-        self.client = OpenAI(api_key=api_key)
+        self.aclient = _shared_openai()
 
-    def fetch_chat_completion(self, prompt: str) -> str:
-        response = self.client.chat.completions.create(
+    def _messages(self, prompt: str) -> List[dict]:
+        return [
+            {"role": "system", "content": "당신은 IT 기술 면접 전문가입니다. **모든 답변은 반드시 처음부터 끝까지 한국어로만 작성하세요.** 영어를 절대 섞지 마세요."},
+            {"role": "user", "content": prompt}
+        ]
+
+    async def afetch_chat_completion(self, prompt: str, json_mode: bool = False) -> str:
+        cache = get_cache()
+        key = make_key("chat_json" if json_mode else "chat", "openai", "gpt-4o-mini", prompt)
+        cached = None if cache_bypassed() else await cache.get(key)
+        if cached is not None:
+            return cached.decode("utf-8")
+
+        extra = {"response_format": {"type": "json_object"}} if json_mode else {}
+        response = await _call_openai(
+            self.aclient.chat.completions.create,
+            _estimate_tokens(prompt),
             model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "당신은 IT 기술 면접 전문가입니다. **모든 답변은 반드시 처음부터 끝까지 한국어로만 작성하세요.** 영어를 절대 섞지 마세요."},
-                {"role": "user", "content": prompt}
-            ],
+            messages=self._messages(prompt),
+            **extra,
         )
-        return response.choices[0].message.content
-
-    def get_embedding(self, text: str) -> List[float]:
-        response = self.client.embeddings.create(
-            model="text-embedding-3-small",
-            input=text,
+        content = response.choices[0].message.content
+        await cache.set(key, content.encode("utf-8"))
+        return content
+
+    async def astream_chat_completion(self, prompt: str) -> AsyncIterator[str]:
+        stream = await _open_openai_stream(
+            self.aclient.chat.completions.create,
+            _estimate_tokens(prompt),
+            model="gpt-4o-mini",
+            messages=self._messages(prompt),
+            stream=True,
         )
-        return response.data[0].embedding
+        try:
+            async for chunk in stream:
+                if chunk.choices:
+                    yield chunk.choices[0].delta.content or ""
+        finally:
+            _OPENAI_SEM.release()
+
+    async def aget_embedding(self, text: str) -> List[float]:
+        return (await self.aget_embeddings([text]))[0]
+
+    async def aget_embeddings(self, texts: List[str]) -> List[List[float]]:
+        cache = get_cache()
+        keys = [make_key("embedding", "openai", "text-embedding-3-small", t) for t in texts]
+        cached = await asyncio.gather(*[cache.get(k) for k in keys])
+        vecs = [decode_embedding(c) if c is not None else None for c in cached]
+
+        # 캐시에 없는 텍스트만 모아 임베딩 API에 한 번의 왕복으로 요청합니다.
+        missing = [i for i, v in enumerate(vecs) if v is None]
+        if missing:
+            response = await _call_openai(
+                self.aclient.embeddings.create,
+                _estimate_tokens(*[texts[i] for i in missing]),
+                model="text-embedding-3-small",
+                input=[texts[i] for i in missing],
+            )
+            for i, d in zip(missing, response.data):
+                vecs[i] = d.embedding
+                await cache.set(keys[i], encode_embedding(d.embedding))
+        return vecs
+
+    async def submit_batch(self, prompts: List[str], metadata: Optional[dict] = None) -> str:
+        # Batch API는 24시간 내 비동기 처리 대신 50% 저렴하며 동기 요청의 rate limit과 경쟁하지 않습니다.
+        lines = [
+            json.dumps({
+                "custom_id": f"request-{i}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {"model": "gpt-4o-mini", "messages": self._messages(p)},
+            }, ensure_ascii=False)
+            for i, p in enumerate(prompts)
+        ]
+        # 파일/배치 API 호출도 공유 클라이언트를 쓰므로 같은 재시도 래퍼를 거칩니다.
+        batch_file = await _call_openai(
+            self.aclient.files.create,
+            1,
+            file=("batch.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch",
+        )
+        batch = await _call_openai(
+            self.aclient.batches.create,
+            1,
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+            metadata=metadata,
+        )
+        return batch.id
+
+    async def retrieve_batch(self, batch_id: str) -> dict:
+        batch = await _call_openai(self.aclient.batches.retrieve, 1, batch_id=batch_id)
+        result = {
+            "batch_id": batch.id,
+            "status": batch.status,
+            "metadata": dict(batch.metadata or {}),
+            "outputs": None,
+        }
+        if batch.status == "completed" and batch.output_file_id:
+            content = await _call_openai(self.aclient.files.content, 1, file_id=batch.output_file_id)
+            rows = [json.loads(line) for line in content.text.splitlines() if line.strip()]
+            # 출력 파일의 순서는 보장되지 않으므로 custom_id 기준으로 정렬합니다.
+            rows.sort(key=lambda r: int(r["custom_id"].rsplit("-", 1)[1]))
+            # 실패한 요청도 response(4xx/5xx 상태 코드와 error 본문)를 가지므로 상태 코드로 성공 여부를 판단합니다.
+            result["outputs"] = [
+                r["response"]["body"]["choices"][0]["message"]["content"]
+                if (r.get("response") or {}).get("status_code") == 200 else None
+                for r in rows
+            ]
+        return result
 
     def get_provider_name(self) -> str:
         return "OpenAI (gpt-4o-mini)"
@@ -48,36 +237,65 @@ class FriendliService(BaseAIService):
         api_key = os.environ.get("FRIENDLI_API_KEY")
         self.has_key = bool(api_key)
         if self.has_key:
-            self.client = OpenAI(
+            self.aclient = AsyncOpenAI(
                 api_key=api_key,
                 base_url="https://inference.friendli.ai/v1"
             )
+        # 임베딩은 OpenAI로 대체하므로 공유 클라이언트의 연결 풀을 재사용합니다.
+        self._openai_fallback = _shared_openai() if os.environ.get("OPENAI_API_KEY") else None
 
-    def fetch_chat_completion(self, prompt: str) -> str:
+    async def afetch_chat_completion(self, prompt: str, json_mode: bool = False) -> str:
+        # JSON 출력은 프롬프트 지시에 맡깁니다.
         if not self.has_key:
             raise ValueError("Friendli API 키가 설정되지 않았습니다.")
 
-        # Llama 모델은 한국어 지시를 최상단에 두어야 효과적입니다.
-        response = self.client.chat.completions.create(
+        response = await self.aclient.chat.completions.create(
             model="meta-llama-3.1-8b-instruct",
-            messages=[
-                {"role": "system", "content": "당신은 한국어 면접 전문가입니다. 모든 출력은 반드시 한국어로만 상세히 작성해야 합니다."},
-                {"role": "user", "content": prompt}
-            ]
+            messages=self._messages(prompt)
         )
         return response.choices[0].message.content
 
-    def get_embedding(self, text: str) -> List[float]:
-        openai_key = os.environ.get("OPENAI_API_KEY")
-        if not openai_key:
+    def _messages(self, prompt: str) -> List[dict]:
+        # Llama 모델은 한국어 지시를 최상단에 두어야 효과적입니다.
+        return [
+            {"role": "system", "content": "당신은 한국어 면접 전문가입니다. 모든 출력은 반드시 한국어로만 상세히 작성해야 합니다."},
+            {"role": "user", "content": prompt}
+        ]
+
+    async def astream_chat_completion(self, prompt: str) -> AsyncIterator[str]:
+        if not self.has_key:
+            raise ValueError("Friendli API 키가 설정되지 않았습니다.")
+        stream = await self.aclient.chat.completions.create(
+            model="meta-llama-3.1-8b-instruct",
+            messages=self._messages(prompt),
+            stream=True
+        )
+        async for chunk in stream:
+            if chunk.choices:
+                yield chunk.choices[0].delta.content or ""
+
+    async def aget_embedding(self, text: str) -> List[float]:
+        if self._openai_fallback is None:
             return [0.0] * 1536
-        client = OpenAI(api_key=openai_key)
-        response = client.embeddings.create(
+        response = await _call_openai(
+            self._openai_fallback.embeddings.create,
+            _estimate_tokens(text),
             model="text-embedding-3-small",
             input=text,
         )
         return response.data[0].embedding
 
+    async def aget_embeddings(self, texts: List[str]) -> List[List[float]]:
+        if self._openai_fallback is None:
+            return [[0.0] * 1536 for _ in texts]
+        response = await _call_openai(
+            self._openai_fallback.embeddings.create,
+            _estimate_tokens(*texts),
+            model="text-embedding-3-small",
+            input=texts,
+        )
+        return [d.embedding for d in response.data]
+
     def get_provider_name(self) -> str:
         return "Friendli AI (meta-llama-3.1-8b-instruct)"
 
@@ -90,34 +308,70 @@ class GeminiService(BaseAIService):
             genai.configure(api_key=api_key)
             self.model = genai.GenerativeModel('gemini-2.0-flash-lite')
             self.genai = genai
+        self._openai_fallback = _shared_openai() if os.environ.get("OPENAI_API_KEY") else None
 
-    def fetch_chat_completion(self, prompt: str) -> str:
+    async def afetch_chat_completion(self, prompt: str, json_mode: bool = False) -> str:
         if not self.has_key:
             raise ValueError("Gemini API 키가 설정되지 않았습니다.")
+        generation_config = {"response_mime_type": "application/json"} if json_mode else None
         # 프롬프트 앞에 강력한 한글 답변 지시사항을 추가합니다.
-        response = self.model.generate_content("다음 요청에 대해 반드시 전문적인 한국어로만 답변하세요:\n\n" + prompt)
+        response = await self.model.generate_content_async(
+            "다음 요청에 대해 반드시 전문적인 한국어로만 답변하세요:\n\n" + prompt,
+            generation_config=generation_config
+        )
         return response.text
 
-    def get_embedding(self, text: str) -> List[float]:
+    async def astream_chat_completion(self, prompt: str) -> AsyncIterator[str]:
+        if not self.has_key:
+            raise ValueError("Gemini API 키가 설정되지 않았습니다.")
+        response = await self.model.generate_content_async(
+            "다음 요청에 대해 반드시 전문적인 한국어로만 답변하세요:\n\n" + prompt,
+            stream=True
+        )
+        async for chunk in response:
+            yield chunk.text
+
+    async def aget_embedding(self, text: str) -> List[float]:
         if self.has_key:
             try:
-                result = self.genai.embed_content(
+                result = await self.genai.embed_content_async(
                     model="models/text-embedding-004",
                     content=text
                 )
                 return result['embedding']
             except:
                 pass
-        openai_key = os.environ.get("OPENAI_API_KEY")
-        if not openai_key:
+        if self._openai_fallback is None:
             return [0.0] * 1536
-        client = OpenAI(api_key=openai_key)
-        response = client.embeddings.create(
+        response = await _call_openai(
+            self._openai_fallback.embeddings.create,
+            _estimate_tokens(text),
             model="text-embedding-3-small",
             input=text,
         )
         return response.data[0].embedding
 
+    async def aget_embeddings(self, texts: List[str]) -> List[List[float]]:
+        if self.has_key:
+            try:
+                # content에 리스트를 넘기면 한 번의 요청으로 모든 임베딩을 받습니다.
+                result = await self.genai.embed_content_async(
+                    model="models/text-embedding-004",
+                    content=texts
+                )
+                return result['embedding']
+            except:
+                pass
+        if self._openai_fallback is None:
+            return [[0.0] * 1536 for _ in texts]
+        response = await _call_openai(
+            self._openai_fallback.embeddings.create,
+            _estimate_tokens(*texts),
+            model="text-embedding-3-small",
+            input=texts,
+        )
+        return [d.embedding for d in response.data]
+
     def get_provider_name(self) -> str:
         return "Google Gemini (gemini-2.0-flash-lite)"
 
@@ -125,9 +379,9 @@ class InterviewService:
     def __init__(self, ai_service: BaseAIService):
         self.ai = ai_service
 
-    def generate_content(self, job_position: str):
+    def build_prompt(self, job_position: str) -> str:
         # 영문 태그([QUESTION] 등)를 모두 한글로 교체하여 언어 이탈을 방지합니다.
-        prompt = f"""
+        return f"""
         다음 직무에 대해 변별력이 높은 고난도 면접 데이터를 **반드시 한국어로만** 생성하세요: {job_position}.
         모든 텍스트에 영어 사용을 금지하며, 전문 용어는 한글로 적거나 한글 뒤 괄호를 사용하세요.
 
@@ -147,49 +401,111 @@ class InterviewService:
         (최고 수준의 전문가가 제시하는 가장 완성도 높은 한국어 본문만 작성하세요.)
         """
 
-        raw_text = self.ai.fetch_chat_completion(prompt)
-
-        # 바뀐 한글 태그에 맞게 정규표현식 수정
-        q_match = re.search(r"\[질문\](.*?)(\[면접자 1\]|$)", raw_text, re.S)
-        c1 = re.search(r"\[면접자 1\](.*?)(\[면접자 2\]|$)", raw_text, re.S)
-        c2 = re.search(r"\[면접자 2\](.*?)(\[면접자 3\]|$)", raw_text, re.S)
-        c3 = re.search(r"\[면접자 3\](.*?)(\[모범답안\]|$)", raw_text, re.S)
-        ref = re.search(r"\[모범답안\](.*?)$", raw_text, re.S)
+    def parse_content(self, raw_text: str, job_position: str) -> dict:
+        sections = _parse_sections(raw_text)
 
-        question = q_match.group(1).strip() if q_match else f"{job_position} 심화 기술 면접 질문입니다."
+        # 누락된 섹션이 있으면 자리표시 문구로 채우고, 캐시에 남지 않도록 표시해 둡니다.
+        missing = any(key not in sections for key in ("질문", "면접자 1", "면접자 2", "면접자 3", "모범답안"))
+        question = sections.get("질문", f"{job_position} 심화 기술 면접 질문입니다.")
         transcripts = [
-            c1.group(1).strip() if c1 else f"{job_position} 전문가 답변 데이터 생성 중...",
-            c2.group(1).strip() if c2 else f"{job_position} 실무자 답변 데이터 생성 중...",
-            c3.group(1).strip() if c3 else f"{job_position} 주니어 답변 데이터 생성 중..."
+            sections.get("면접자 1", f"{job_position} 전문가 답변 데이터 생성 중..."),
+            sections.get("면접자 2", f"{job_position} 실무자 답변 데이터 생성 중..."),
+            sections.get("면접자 3", f"{job_position} 주니어 답변 데이터 생성 중...")
         ]
-        reference = ref.group(1).strip() if ref else f"{job_position} 모범 답안 생성 중..."
+        reference = sections.get("모범답안", f"{job_position} 모범 답안 생성 중...")
 
         return {
             "question": question,
             "transcripts": transcripts,
-            "reference": reference
+            "reference": reference,
+            "incomplete": missing
         }
 
+    async def _generate_content(self, job_position: str) -> dict:
+        raw_text = await self.ai.afetch_chat_completion(self.build_prompt(job_position))
+        return self.parse_content(raw_text, job_position)
+
+    async def generate_content(self, job_position: str, use_cache: bool = True) -> dict:
+        if not use_cache:
+            # 새로 생성한 결과로 캐시를 갱신하여 이후 요청이 오래된 결과를 받지 않도록 합니다.
+            _generate_content_cached.cache_invalidate(self.ai, job_position)
+        data = await _generate_content_cached(self.ai, job_position)
+        if data["incomplete"]:
+            # 파싱에 실패해 자리표시 문구가 섞인 결과는 재사용하지 않습니다.
+            _generate_content_cached.cache_invalidate(self.ai, job_position)
+        # 캐시된 결과를 호출자가 수정하지 않도록 얕은 복사본을 반환합니다.
+        return {
+            "question": data["question"],
+            "transcripts": list(data["transcripts"]),
+            "reference": data["reference"]
+        }
+
+@alru_cache(maxsize=64, ttl=3600)
+async def _generate_content_cached(ai: BaseAIService, job_position: str) -> dict:
+    # 제공자 인스턴스는 프로세스 내 싱글턴이므로 (제공자, 직무) 단위로 결과가 재사용됩니다.
+    return await InterviewService(ai)._generate_content(job_position)
+
+# 교차 분석 리포트의 5개 항목입니다. 스트리밍 리포트와 통합 호출 프롬프트가 함께 사용합니다.
+_REPORT_SECTIONS = """1. 공통 강점 및 기술적 특징
+        2. 주요 누락 사항 및 공통 약점
+        3. 변별력을 가르는 핵심적 차이점
+        4. 전문가 기준 대비 정렬도 및 신뢰성 분석
+        5. 실무 투입 시나리오별 채용 전략 권고"""
+
 class EvaluationService:
     def __init__(self, ai_service: BaseAIService):
         self.ai = ai_service
 
     def cosine_sim(self, vec_a: List[float], vec_b: List[float]) -> float:
-        if not vec_a or not vec_b or len(vec_a) != len(vec_b):
+        if len(vec_a) == 0 or len(vec_b) == 0 or len(vec_a) != len(vec_b):
             return 0.0
-        dot = sum(a * b for a, b in zip(vec_a, vec_b))
-        norm_a = sum(a * a for a in vec_a) ** 0.5
-        norm_b = sum(b * b for b in vec_b) ** 0.5
-        res = dot / (norm_a * norm_b) if norm_a * norm_b > 0 else 0.0
-        return 1.0 if abs(res - 1.0) < 1e-12 else res
+        a = np.asarray(vec_a, dtype=np.float32)
+        b = np.asarray(vec_b, dtype=np.float32)
+        na = np.linalg.norm(a)
+        nb = np.linalg.norm(b)
+        if na == 0 or nb == 0:
+            return 0.0
+        # 벡터를 정규화해 복사하지 않고 내적 한 번을 노름의 곱으로 나눕니다.
+        res = float(a @ b / (na * nb))
+        # float32 연산 오차로 동일 벡터가 1.0 바로 아래 값이 되는 것을 보정합니다.
+        return 1.0 if abs(res - 1.0) < 1e-6 else res
+
+    def _unit(self, vec: List[float]) -> np.ndarray:
+        v = np.asarray(vec, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm > 0 else v
+
+    def similarities_to_reference(self, cand_vecs: List[List[float]], ref_vec: List[float]) -> List[float]:
+        # 지원자 벡터를 (N, D) 행렬로 쌓아 행 단위로 한 번에 정규화하고, 한 번의 행렬-벡터 곱으로 코사인을 구합니다.
+        ref_unit = self._unit(ref_vec)
+        sims = np.zeros(len(cand_vecs), dtype=np.float32)
+        # 차원이 다른 벡터(예: 제공자 폴백으로 섞인 임베딩)는 비교하지 않고 0으로 둡니다.
+        rows = [i for i, v in enumerate(cand_vecs) if len(v) and len(v) == len(ref_unit)]
+        if rows and len(ref_unit):
+            m = np.asarray([cand_vecs[i] for i in rows], dtype=np.float32)
+            norms = np.linalg.norm(m, axis=1, keepdims=True)
+            m = np.divide(m, norms, out=np.zeros_like(m), where=norms > 0)
+            sims[rows] = m @ ref_unit
+        return [1.0 if abs(s - 1.0) < 1e-6 else float(s) for s in sims]
+
+    def tokenize_reference(self, reference: str) -> Counter:
+        return Counter(_WORD_RE.findall(reference.lower()))
+
+    def calculate_rouge_pretokenized(self, candidate: str, ref_tokens: Counter) -> float:
+        # 기준 답변 토큰 빈도는 호출자가 한 번만 만들어 재사용합니다.
+        # 토큰 빈도를 반영한 ROUGE-1 F1: 중복 단어는 양쪽 빈도의 최솟값만큼 일치로 셉니다.
+        cand_tokens = Counter(_WORD_RE.findall(candidate.lower()))
+        if not cand_tokens or not ref_tokens:
+            return 0.0
+        overlap = sum((cand_tokens & ref_tokens).values())
+        if overlap == 0:
+            return 0.0
+        precision = overlap / sum(cand_tokens.values())
+        recall = overlap / sum(ref_tokens.values())
+        return 2 * precision * recall / (precision + recall)
 
     def calculate_rouge(self, candidate: str, reference: str) -> float:
-        cand = re.findall(r"\w+", candidate.lower())
-        ref = re.findall(r"\w+", reference.lower())
-        if not cand or not ref:
-            return 0.0
-        overlap = len(set(cand) & set(ref))
-        return overlap / len(set(ref))
+        return self.calculate_rouge_pretokenized(candidate, self.tokenize_reference(reference))
 
     def calculate_grade(self, score: float) -> str:
         if score >= 0.9: return "A"
@@ -197,70 +513,95 @@ class EvaluationService:
         if score >= 0.7: return "C"
         return "D"
 
-    def generate_cross_analysis(self, transcripts: List[str], reference: str, position: str) -> str:
-        prompt = f"""
-        당신은 기술 심사위원입니다. {position} 직무 지원자 {len(transcripts)}명의 답변을 한국어로 정밀 분석하세요.
+    def _analysis_context(self, role: str, transcripts: List[str], reference: str, position: str) -> str:
+        # 스트리밍 리포트와 리포트+채용 근거 통합 호출이 같은 문맥을 쓰도록 공통 머리말을 만듭니다.
+        return f"""
+        당신은 {role}입니다. {position} 직무 지원자 {len(transcripts)}명의 답변을 한국어로 정밀 분석하세요.
         전문가 기준 답변: {reference}
 
         지원자 답변 목록:
         {chr(10).join([f"면접자 {i+1}: {t}" for i, t in enumerate(transcripts)])}
+        """
 
+    def _cross_analysis_prompt(self, transcripts: List[str], reference: str, position: str) -> str:
+        return self._analysis_context("기술 심사위원", transcripts, reference, position) + f"""
         기술적 깊이, 아키텍처 이해도, 성능 최적화 관점을 포함하여 **반드시 한국어로** 리포트를 작성하세요:
-        1. 공통 강점 및 기술적 특징
-        2. 주요 누락 사항 및 공통 약점
-        3. 변별력을 가르는 핵심적 차이점
-        4. 전문가 기준 대비 정렬도 및 신뢰성 분석
-        5. 실무 투입 시나리오별 채용 전략 권고
+        {_REPORT_SECTIONS}
         """
-        return self.ai.fetch_chat_completion(prompt)
-
-    def get_hire_decision(self, transcripts: List[str], reference: str) -> HireDecision:
-        sims = []
-        ref_vec = self.ai.get_embedding(reference)
-        for t in transcripts:
-            cand_vec = self.ai.get_embedding(t)
-            sims.append(self.cosine_sim(cand_vec, ref_vec))
 
-        best_index = sims.index(max(sims))
+    async def astream_report(self, transcripts: List[str], reference: str, position: str = "Unknown") -> AsyncIterator[str]:
+        prompt = self._cross_analysis_prompt(transcripts, reference, position)
+        async for piece in self.ai.astream_chat_completion(prompt):
+            yield piece
+
+    async def _score_candidates(self, transcripts: List[str], reference: str):
+        # 기준 답변과 모든 지원자 답변의 임베딩을 한 번의 배치 요청으로 가져오되,
+        # 같은 텍스트(중복 답변, 기준 답변과 동일한 답변)는 한 번만 요청합니다.
+        unique = list(dict.fromkeys([reference] + transcripts))
+        by_text = dict(zip(unique, await self.ai.aget_embeddings(unique)))
+        ref_vec = by_text[reference]
+        cand_vecs = [by_text[t] for t in transcripts]
+        sims = self.similarities_to_reference(cand_vecs, ref_vec)
+
+        best_index = int(np.argmax(sims))
+        ref_tokens = self.tokenize_reference(reference)
+        rouge_by_text = {
+            t: self.calculate_rouge_pretokenized(t, ref_tokens) for t in dict.fromkeys(transcripts)
+        }
         candidate_scores = []
         for i, (t, sim) in enumerate(zip(transcripts, sims), start=1):
-            rouge = self.calculate_rouge(t, reference)
+            rouge = rouge_by_text[t]
             overall = (sim + rouge) / 2
-            candidate_scores.append(CandidateScore(
+            candidate_scores.append(CandidateScore.model_construct(
                 candidate_number=i, cosine_score=sim, rouge_score=rouge,
                 overall_score=overall, grade=self.calculate_grade(overall)
             ))
+        return candidate_scores, best_index
 
-        prompt = f"""
-        당신은 CTO입니다. 다음 지원자들의 답변을 기술 면접 기준과 대조하여 최종 채용 의견을 **반드시 한국어로** 작성하세요.
-        기준 답변: {reference}
-        지원자별 답변:
-        {chr(10).join([f"면접자 {i+1}: {t}" for i, t in enumerate(transcripts)])}
+    async def _generate_report_and_reason(self, transcripts: List[str], reference: str, position: str, best_index: int):
+        # 교차 분석 리포트와 채용 근거는 같은 문맥(기준 답변 + 전체 답변)을 쓰므로 한 번의 호출로 함께 생성합니다.
+        prompt = self._analysis_context("기술 심사위원이자 CTO", transcripts, reference, position) + f"""
+        다음 두 가지를 **반드시 한국어로** 작성하세요.
+        report: 기술적 깊이, 아키텍처 이해도, 성능 최적화 관점을 포함한 교차 분석 리포트
+        {_REPORT_SECTIONS}
+        reason: 면접자 {best_index + 1}의 답변이 왜 우수한지에 대한 최종 채용 의견
 
-        면접자 {best_index + 1}의 답변이 왜 우수한지 한국어로 상세히 기술하세요.
+        두 값은 모두 하나의 문자열이어야 하며, JSON 형식으로 {{"report": "...", "reason": "..."}} 만 출력하세요.
         """
-        explanation = self.ai.fetch_chat_completion(prompt)
+        raw_text = await self.ai.afetch_chat_completion(prompt, json_mode=True)
+        try:
+            data = orjson.loads(raw_text.strip().removeprefix("```json").removesuffix("```").strip())
+            report, reason = data["report"], data["reason"]
+        except (orjson.JSONDecodeError, KeyError, TypeError):
+            # JSON을 지키지 않은 응답은 원문을 그대로 사용합니다.
+            return raw_text, raw_text
+        return (
+            report if isinstance(report, str) else orjson.dumps(report).decode("utf-8"),
+            reason if isinstance(reason, str) else orjson.dumps(reason).decode("utf-8"),
+        )
 
-        return HireDecision(
+    async def process_analysis(self, transcripts, reference, position="Unknown", question=None):
+        candidate_scores, best_index = await self._score_candidates(transcripts, reference)
+        cross_analysis, explanation = await self._generate_report_and_reason(
+            transcripts, reference, position, best_index
+        )
+        decision = HireDecision.model_construct(
             selected_candidate=best_index + 1,
             scores=candidate_scores,
             reason=explanation
         )
 
-    def process_analysis(self, transcripts, reference, position="Unknown", question=None):
-        decision = self.get_hire_decision(transcripts, reference)
-        cross_analysis = self.generate_cross_analysis(transcripts, reference, position)
-
-        return {
-            "question": question,
-            "report": cross_analysis,
-            "score": sum(s.overall_score for s in decision.scores) / len(decision.scores),
-            "cosine_score": decision.scores[decision.selected_candidate - 1].cosine_score,
-            "rouge_score": decision.scores[decision.selected_candidate - 1].rouge_score,
-            "grade": decision.scores[decision.selected_candidate - 1].grade,
-            "iterations": [],
-            "transcripts": transcripts,
-            "reference": reference,
-            "hire_decision": decision,
-            "ai_provider": self.ai.get_provider_name()
-        }
\ No newline at end of file
+        # 내부에서 만든 신뢰할 수 있는 값이므로 검증 없이 응답 모델을 조립합니다.
+        return InterviewResponse.model_construct(
+            question=question,
+            report=cross_analysis,
+            score=sum(s.overall_score for s in decision.scores) / len(decision.scores),
+            cosine_score=decision.scores[decision.selected_candidate - 1].cosine_score,
+            rouge_score=decision.scores[decision.selected_candidate - 1].rouge_score,
+            grade=decision.scores[decision.selected_candidate - 1].grade,
+            iterations=[],
+            transcripts=transcripts,
+            reference=reference,
+            hire_decision=decision,
+            ai_provider=self.ai.get_provider_name()
+        )
\ No newline at end of file
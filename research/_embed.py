@@ -0,0 +1,55 @@
+from functools import cache
+from typing import List
+
+import numpy as np
+import torch
+from joblib import Memory
+from sentence_transformers import SentenceTransformer
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+_memory = Memory(".cache/embeddings", verbose=0)
+
+_model = None
+
+
+def _cpu_has_bf16() -> bool:
+    # Without AVX512-BF16/AMX, PyTorch emulates bf16 matmuls and is slower than fp32.
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+@cache
+def _precision() -> str:
+    if torch.cuda.is_available():
+        return "fp16"
+    return "bf16" if _cpu_has_bf16() else "fp32"
+
+
+def get_model() -> SentenceTransformer:
+    global _model
+    if _model is None:
+        model = SentenceTransformer(MODEL_NAME)
+        if _precision() == "fp16":
+            model = model.half()
+        elif _precision() == "bf16":
+            model[0].auto_model = model[0].auto_model.to(torch.bfloat16)
+        _model = model
+    return _model
+
+
+def encode(texts: List[str], **kwargs) -> np.ndarray:
+    return np.asarray(get_model().encode(texts, **kwargs), dtype=np.float32)
+
+
+@_memory.cache
+def _encode_cached(text: str, model_name: str, dtype: str) -> np.ndarray:
+    return encode([text], normalize_embeddings=True)[0]
+
+
+def encode_cached(text: str) -> np.ndarray:
+    return _encode_cached(text, MODEL_NAME, _precision())
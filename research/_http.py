@@ -0,0 +1,14 @@
+from importlib.util import find_spec
+
+import httpx
+
+_HTTP2 = find_spec("h2") is not None
+_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64)
+
+
+def pooled_client() -> httpx.Client:
+    return httpx.Client(http2=_HTTP2, limits=_LIMITS, timeout=60)
+
+
+def pooled_async_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(http2=_HTTP2, limits=_LIMITS, timeout=60)
@@ -0,0 +1,72 @@
+from collections import Counter
+from typing import List, Tuple
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+MIN_JIT_TOKENS = 64
+
+
+def _f1(overlap: int, n_gen: int, n_ref: int) -> float:
+    if overlap == 0:
+        return 0.0
+    precision = overlap / n_gen
+    recall = overlap / n_ref
+    return 2 * (precision * recall) / (precision + recall)
+
+
+if njit is not None:
+
+    @njit(cache=True)
+    def _overlap(a_ids, a_cnt, b_ids, b_cnt):
+        i = 0
+        j = 0
+        overlap = 0
+        while i < a_ids.shape[0] and j < b_ids.shape[0]:
+            if a_ids[i] == b_ids[j]:
+                overlap += min(a_cnt[i], b_cnt[j])
+                i += 1
+                j += 1
+            elif a_ids[i] < b_ids[j]:
+                i += 1
+            else:
+                j += 1
+        return overlap
+
+else:
+    _overlap = None
+
+
+def _hashed_counts(counts: Counter) -> Tuple[np.ndarray, np.ndarray]:
+    ids = np.fromiter((hash(t) for t in counts), dtype=np.int64, count=len(counts))
+    cnt = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+    order = np.argsort(ids)
+    return ids[order], cnt[order]
+
+
+def overlap_count(gen_tokens: List[str], ref_counts: Counter) -> int:
+    if not gen_tokens or not ref_counts:
+        return 0
+    if _overlap is None or (
+        len(gen_tokens) < MIN_JIT_TOKENS
+        and sum(ref_counts.values()) < MIN_JIT_TOKENS
+    ):
+        return sum((Counter(gen_tokens) & ref_counts).values())
+    gen_ids = np.fromiter(
+        (hash(t) for t in gen_tokens), dtype=np.int64, count=len(gen_tokens)
+    )
+    a_ids, a_cnt = np.unique(gen_ids, return_counts=True)
+    b_ids, b_cnt = _hashed_counts(ref_counts)
+    return int(_overlap(a_ids, a_cnt.astype(np.int64), b_ids, b_cnt))
+
+
+def rouge_f1(gen_tokens: List[str], ref_counts: Counter) -> float:
+    return _f1(
+        overlap_count(gen_tokens, ref_counts),
+        len(gen_tokens),
+        sum(ref_counts.values()),
+    )
@@ -1,44 +1,43 @@
+import asyncio
 import os
-from typing import Dict, List
+import string
+from collections import Counter
+from typing import Dict, List, Optional
 
-from openai import OpenAI
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+from openai import AsyncOpenAI
 
-OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY)
-eval_model = SentenceTransformer("all-MiniLM-L6-v2")
-
-
-def run_integrated_pipeline(
-    transcripts: List[str], expert_reference: str, max_iterations: int = 3
-) -> Dict:
-    print("=" * 70)
-    print("Integrated Cross-Interview Analysis & Performance Evaluation System")
-    print("=" * 70)
-
-    best_score = 0
-    best_report = ""
-    iteration_history = []
+from _embed import encode, encode_cached
+from _http import pooled_async_client
+from _rouge import rouge_f1
 
-    for iteration in range(max_iterations):
-        print(f"\n[Iteration {iteration+1}/{max_iterations}] Starting analysis...")
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+aclient = AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=pooled_async_client())
 
-        formatted_input = "\n".join(
-            [f"Interview {i+1}: {t}" for i, t in enumerate(transcripts)]
-        )
+_PUNCT_TBL = str.maketrans("", "", string.punctuation)
 
-        refinement_hint = ""
-        if iteration > 0:
-            refinement_hint = f"""
+_STOPWORDS = frozenset(
+    {
+        "the",
+        "is",
+        "are",
+        "and",
+        "or",
+        "but",
+        "in",
+        "on",
+        "at",
+        "to",
+        "for",
+        "of",
+        "with",
+        "by",
+    }
+)
 
-Previous Analysis Feedback:
-- Previous score: {iteration_history[-1]['score']:.4f}
-- Improvement direction: Use similar terms and structure as expert answer
-- Reference key keywords: {extract_keywords(expert_reference)}
-"""
+# Each iteration samples candidates around the base temperature in parallel and keeps the best-scoring one.
+_TEMPERATURE_OFFSETS = (-0.2, 0.0, 0.2)
 
-        analysis_prompt = f"""
+_ANALYSIS_TEMPLATE = """
 You are a professional business consultant. Analyze the provided interview transcripts and create an integrated report.
 
 Analysis Guidelines:
@@ -61,19 +60,75 @@ Project Insights
 - (specific suggestions)
 """
 
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": analysis_prompt}],
-            temperature=0.7 - (iteration * 0.1),
-        )
-        ai_report = response.choices[0].message.content
 
-        embeddings = eval_model.encode([ai_report, expert_reference])
-        cosine_score = cosine_similarity([embeddings[0]], [embeddings[1]])[0][0]
+async def run_integrated_pipeline(
+    transcripts: List[str], expert_reference: str, max_iterations: int = 3
+) -> Dict:
+    print("=" * 70)
+    print("Integrated Cross-Interview Analysis & Performance Evaluation System")
+    print("=" * 70)
+
+    best_score = 0
+    best_report = ""
+    iteration_history = []
+
+    ref_emb = encode_cached(expert_reference)
+    ref_counts = Counter(_tokenize(expert_reference))
+    ref_keywords = extract_keywords(expert_reference)
+    formatted_input = "\n".join(
+        [f"Interview {i+1}: {t}" for i, t in enumerate(transcripts)]
+    )
+
+    for iteration in range(max_iterations):
+        print(f"\n[Iteration {iteration+1}/{max_iterations}] Starting analysis...")
+
+        refinement_hint = ""
+        if iteration > 0:
+            refinement_hint = f"""
 
-        rouge_score = calculate_rouge_simple(ai_report, expert_reference)
+Previous Analysis Feedback:
+- Previous score: {iteration_history[-1]['score']:.4f}
+- Improvement direction: Use similar terms and structure as expert answer
+- Reference key keywords: {ref_keywords}
+"""
+
+        analysis_prompt = _ANALYSIS_TEMPLATE.format(
+            formatted_input=formatted_input, refinement_hint=refinement_hint
+        )
 
-        overall_score = (cosine_score * 0.7) + (rouge_score * 0.3)
+        base_temp = 0.7 - (iteration * 0.1)
+        candidate_temps = [max(0.0, base_temp + d) for d in _TEMPERATURE_OFFSETS]
+        responses = await asyncio.gather(
+            *[
+                aclient.chat.completions.create(
+                    model="gpt-4o",
+                    messages=[{"role": "user", "content": analysis_prompt}],
+                    temperature=t,
+                )
+                for t in candidate_temps
+            ]
+        )
+        candidates = [r.choices[0].message.content for r in responses]
+
+        gen_embs = encode(candidates, normalize_embeddings=True)
+        cosine_scores = gen_embs @ ref_emb
+        rouge_scores = [
+            calculate_rouge_simple(c, expert_reference, ref_counts)
+            for c in candidates
+        ]
+        overall_scores = [
+            (float(c) * 0.7) + (r * 0.3) for c, r in zip(cosine_scores, rouge_scores)
+        ]
+
+        best_idx = max(range(len(candidates)), key=overall_scores.__getitem__)
+        ai_report = candidates[best_idx]
+        cosine_score = float(cosine_scores[best_idx])
+        rouge_score = rouge_scores[best_idx]
+        overall_score = overall_scores[best_idx]
+        print(
+            f"  - Candidates: {len(candidates)} "
+            f"(selected temperature {candidate_temps[best_idx]:.1f})"
+        )
 
         iteration_history.append(
             {
@@ -98,6 +153,18 @@ Project Insights
             print("\nTarget score (0.85) achieved. Stopping iterations")
             break
 
+        if (
+            len(iteration_history) >= 2
+            and abs(iteration_history[-1]["score"] - iteration_history[-2]["score"])
+            < 0.005
+        ):
+            print("\nScore converged. Stopping iterations")
+            break
+
+        if iteration > 0 and overall_score < best_score - 0.05:
+            print("\nScore regressed with refinement hint. Stopping iterations")
+            break
+
     print("\n" + "=" * 70)
     print("[Final AI Cross-Analysis Report]")
     print("=" * 70)
@@ -125,43 +192,21 @@ Project Insights
 
 def extract_keywords(text: str, top_n: int = 5) -> str:
     words = text.lower().split()
-    stopwords = {
-        "the",
-        "is",
-        "are",
-        "and",
-        "or",
-        "but",
-        "in",
-        "on",
-        "at",
-        "to",
-        "for",
-        "of",
-        "with",
-        "by",
-    }
-    keywords = [w for w in words if w not in stopwords and len(w) > 2]
-    from collections import Counter
-
+    keywords = [w for w in words if len(w) > 2 and w not in _STOPWORDS]
     common = Counter(keywords).most_common(top_n)
     return ", ".join([word for word, _ in common])
 
 
-def calculate_rouge_simple(generated: str, reference: str) -> float:
-    gen_words = set(generated.lower().split())
-    ref_words = set(reference.lower().split())
-    common = gen_words.intersection(ref_words)
+def _tokenize(text: str) -> List[str]:
+    return text.lower().translate(_PUNCT_TBL).split()
 
-    precision = len(common) / len(gen_words) if gen_words else 0
-    recall = len(common) / len(ref_words) if ref_words else 0
-    f1 = (
-        2 * (precision * recall) / (precision + recall)
-        if (precision + recall) > 0
-        else 0
-    )
 
-    return f1
+def calculate_rouge_simple(
+    generated: str, reference: str, ref_counts: Optional[Counter] = None
+) -> float:
+    if ref_counts is None:
+        ref_counts = Counter(_tokenize(reference))
+    return rouge_f1(_tokenize(generated), ref_counts)
 
 
 def get_grade(score: float) -> str:
@@ -188,6 +233,6 @@ Core issues are complex payment process and mobile environment instability.
 Security feedback is positive, but intuitive button placement from UI/UX perspective and simple payment introduction are top priorities.
 """
 
-    result = run_integrated_pipeline(
-        sample_interviews, reference_note, max_iterations=3
+    result = asyncio.run(
+        run_integrated_pipeline(sample_interviews, reference_note, max_iterations=3)
     )
@@ -1,18 +1,22 @@
+import asyncio
 import json
 import os
 from typing import Dict, List
 
-from openai import OpenAI
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+import orjson
+from openai import AsyncOpenAI
 
-client = OpenAI(api_key="YOUR_OPENAI_API_KEY")
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+from _embed import encode, encode_cached
+from _http import pooled_async_client
 
+aclient = AsyncOpenAI(
+    api_key="YOUR_OPENAI_API_KEY", http_client=pooled_async_client()
+)
 
-def get_llm_response(prompt: str, model: str = "gpt-4o") -> str:
+
+async def get_llm_response(prompt: str, model: str = "gpt-4o") -> str:
     try:
-        response = client.chat.completions.create(
+        response = await aclient.chat.completions.create(
             model=model, messages=[{"role": "user", "content": prompt}], temperature=0.7
         )
         return response.choices[0].message.content
@@ -20,13 +24,14 @@ def get_llm_response(prompt: str, model: str = "gpt-4o") -> str:
         return f"Error: {str(e)}"
 
 
-def cross_interview_analysis(transcripts: List[str]) -> str:
-    combined_text = "\n\n".join(
-        [
-            f"=== Interview {i+1} ===\n{transcript}"
-            for i, transcript in enumerate(transcripts)
-        ]
+def _format_transcripts(transcripts: List[str]) -> str:
+    return "\n\n".join(
+        f"=== Interview {i+1} ===\n{transcript}"
+        for i, transcript in enumerate(transcripts)
     )
+
+
+async def cross_interview_analysis(combined_text: str) -> str:
     prompt = f"""
 You are an expert consultant analyzing multiple interview transcripts.
 
@@ -41,13 +46,10 @@ Provide a comprehensive cross-interview analysis report covering:
 3. Unique Insights: Noteworthy points mentioned by only one or two candidates
 4. Business Recommendations: Actionable insights based on the overall analysis
 """
-    return get_llm_response(prompt)
+    return await get_llm_response(prompt)
 
 
-def extract_structured_themes(transcripts: List[str]) -> Dict:
-    combined_text = "\n\n".join(
-        [f"Interview {i+1}: {transcript}" for i, transcript in enumerate(transcripts)]
-    )
+async def extract_structured_themes(combined_text: str) -> Dict:
     prompt = f"""
 Analyze these interviews and extract structured data.
 
@@ -68,17 +70,17 @@ Return a JSON object with this structure:
 
 Return ONLY valid JSON, no extra text.
 """
-    response = get_llm_response(prompt)
+    response = await get_llm_response(prompt)
+    response = response.strip().removeprefix("```json").removesuffix("```")
     try:
-        return json.loads(response)
-    except:
+        return orjson.loads(response)
+    except orjson.JSONDecodeError:
         return {"interviews": [], "overall_themes": [], "note": "JSON parsing failed"}
 
 
 def evaluate_cosine_similarity(generated_text: str, reference_text: str) -> float:
-    embeddings = embedding_model.encode([generated_text, reference_text])
-    similarity = cosine_similarity([embeddings[0]], [embeddings[1]])
-    return float(similarity[0][0])
+    gen_emb = encode([generated_text], normalize_embeddings=True)[0]
+    return float(gen_emb @ encode_cached(reference_text))
 
 
 def evaluate_rouge_simple(generated_text: str, reference_text: str) -> Dict[str, float]:
@@ -122,7 +124,7 @@ def get_performance_grade(score: float) -> str:
         return "D (Major Revision Required)"
 
 
-def run_complete_pipeline(interview_files: List[str], ground_truth_path: str):
+async def run_complete_pipeline(interview_files: List[str], ground_truth_path: str):
     print("=" * 70)
     print("ICT GLOBAL INTERNSHIP PORTFOLIO: LLM EVALUATION SYSTEM")
     print("=" * 70)
@@ -144,11 +146,13 @@ def run_complete_pipeline(interview_files: List[str], ground_truth_path: str):
     except FileNotFoundError:
         print(f"  Ground truth file not found: {ground_truth_path}")
         return
-    print("\n[Step 3] Performing cross-interview analysis...")
-    ai_summary = cross_interview_analysis(transcripts)
+    print("\n[Step 3-4] Performing cross-interview analysis and extracting themes...")
+    combined_text = _format_transcripts(transcripts)
+    ai_summary, structured_data = await asyncio.gather(
+        cross_interview_analysis(combined_text),
+        extract_structured_themes(combined_text),
+    )
     print("  Analysis complete")
-    print("\n[Step 4] Extracting structured themes...")
-    structured_data = extract_structured_themes(transcripts)
     print(f"  Extracted {len(structured_data.get('overall_themes',[]))} overall themes")
     print("\n[Step 5] Evaluating AI-generated summary...")
     evaluation_results = evaluate_with_multiple_metrics(ai_summary, ground_truth)
@@ -176,7 +180,7 @@ def run_complete_pipeline(interview_files: List[str], ground_truth_path: str):
     }
 
 
-def run_with_sample_data():
+async def run_with_sample_data():
     print("=" * 70)
     print("SAMPLE RUN: LLM Cross-Interview Analysis & Evaluation")
     print("=" * 70)
@@ -211,11 +215,14 @@ collaboration tools and communication infrastructure. The consensus suggests
 that a flexible hybrid model with strong technological support would address
 most concerns raised by the candidates.
 """
+    combined_text = _format_transcripts(sample_transcripts)
+    ai_summary, structured = await asyncio.gather(
+        cross_interview_analysis(combined_text),
+        extract_structured_themes(combined_text),
+    )
     print("\n[STEP 1] Cross-Interview Analysis\n")
-    ai_summary = cross_interview_analysis(sample_transcripts)
     print(ai_summary)
     print("\n[STEP 2] Structured Theme Extraction\n")
-    structured = extract_structured_themes(sample_transcripts)
     print(json.dumps(structured, indent=2, ensure_ascii=False))
     print("\n[STEP 3] Performance Evaluation\n")
     evaluation = evaluate_with_multiple_metrics(ai_summary, expert_summary)
@@ -233,4 +240,4 @@ most concerns raised by the candidates.
 
 if __name__ == "__main__":
     print("\n Running with sample data \n")
-    run_with_sample_data()
+    asyncio.run(run_with_sample_data())
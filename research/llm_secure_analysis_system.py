@@ -1,11 +1,20 @@
+import asyncio
+import functools
+import hashlib
 import json
 import os
-from typing import Dict, List, Optional
+import re
+import sqlite3
+import sys
+from collections import Counter
+from importlib.util import find_spec
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
-from openai import OpenAI
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+from openai import AsyncOpenAI, OpenAI
+
+from _http import pooled_async_client, pooled_client
+from _rouge import overlap_count
 
 try:
     from dotenv import load_dotenv
@@ -43,16 +52,128 @@ POSTGRES_PASSWORD = os.environ.get("POSTGRES_PASSWORD")
 if not OPENAI_API_KEY:
     raise ValueError("OPENAI_API_KEY environment variable not set")
 
-client = OpenAI(api_key=OPENAI_API_KEY)
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+
+EMBEDDING_MODEL_ID = "sentence-transformers/all-MiniLM-L6-v2"
+ONNX_MODEL_DIR = os.environ.get("ONNX_MODEL_DIR", ".cache/onnx/all-MiniLM-L6-v2")
+EMBEDDER_BACKEND = (
+    "onnx-int8"
+    if find_spec("optimum") and find_spec("onnxruntime")
+    else "transformers"
+)
+
+
+class _OnnxEncoder:
+    def __init__(self, model, tokenizer):
+        self.model = model
+        self.tokenizer = tokenizer
+
+    def encode(
+        self, texts, normalize_embeddings: bool = False, batch_size: int = 32, **kwargs
+    ):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        chunks = []
+        for start in range(0, len(texts), batch_size):
+            batch = self.tokenizer(
+                texts[start : start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=256,
+                return_tensors="np",
+            )
+            token_embs = self.model(**batch).last_hidden_state
+            mask = batch["attention_mask"][..., None].astype(np.float32)
+            embs = (token_embs * mask).sum(axis=1) / np.clip(
+                mask.sum(axis=1), 1e-9, None
+            )
+            if normalize_embeddings:
+                embs = embs / np.linalg.norm(embs, axis=1, keepdims=True)
+            chunks.append(embs.astype(np.float32))
+        embs = np.concatenate(chunks)
+        return embs[0] if single else embs
+
+
+class _HFEncoder:
+    def __init__(self):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        self.torch = torch
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        dtype = torch.float16 if self.device == "cuda" else torch.float32
+        self.tokenizer = AutoTokenizer.from_pretrained(EMBEDDING_MODEL_ID)
+        self.model = (
+            AutoModel.from_pretrained(EMBEDDING_MODEL_ID, torch_dtype=dtype)
+            .to(self.device)
+            .eval()
+        )
+
+    def encode(
+        self, texts, normalize_embeddings: bool = False, batch_size: int = 32, **kwargs
+    ):
+        torch = self.torch
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        chunks = []
+        with torch.inference_mode():
+            for start in range(0, len(texts), batch_size):
+                batch = self.tokenizer(
+                    texts[start : start + batch_size],
+                    padding=True,
+                    truncation=True,
+                    max_length=256,
+                    return_tensors="pt",
+                ).to(self.device)
+                token_embs = self.model(**batch).last_hidden_state.float()
+                mask = batch["attention_mask"].unsqueeze(-1).float()
+                embs = (token_embs * mask).sum(1) / mask.sum(1).clamp(min=1e-9)
+                if normalize_embeddings:
+                    embs = torch.nn.functional.normalize(embs, dim=1)
+                chunks.append(embs.cpu().numpy())
+        embs = np.concatenate(chunks)
+        return embs[0] if single else embs
+
+
+def _load_onnx_encoder() -> _OnnxEncoder:
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    quantized_file = "model_quantized.onnx"
+    if not os.path.exists(os.path.join(ONNX_MODEL_DIR, quantized_file)):
+        model = ORTModelForFeatureExtraction.from_pretrained(
+            EMBEDDING_MODEL_ID, export=True
+        )
+        model.save_pretrained(ONNX_MODEL_DIR)
+        AutoTokenizer.from_pretrained(EMBEDDING_MODEL_ID).save_pretrained(
+            ONNX_MODEL_DIR
+        )
+        quantizer = ORTQuantizer.from_pretrained(model)
+        quantizer.quantize(
+            save_dir=ONNX_MODEL_DIR,
+            quantization_config=AutoQuantizationConfig.avx2(
+                is_static=False, per_channel=False
+            ),
+        )
+    model = ORTModelForFeatureExtraction.from_pretrained(
+        ONNX_MODEL_DIR, file_name=quantized_file
+    )
+    return _OnnxEncoder(model, AutoTokenizer.from_pretrained(ONNX_MODEL_DIR))
+
+
+@functools.cache
+def _get_embedder():
+    if EMBEDDER_BACKEND == "onnx-int8":
+        return _load_onnx_encoder()
+    return _HFEncoder()
 
 
-def generate_cross_interview_analysis(transcripts: List[str]) -> str:
-    formatted_input = ""
-    for index, text in enumerate(transcripts):
-        formatted_input += f"Interview Data {index+1}:\n{text}\n\n"
+@functools.cache
+def _get_openai() -> OpenAI:
+    return OpenAI(api_key=OPENAI_API_KEY, http_client=pooled_client())
 
-    prompt = f"""
+
+_PROMPT_PREFIX = """
 Analyze multiple interview transcripts and generate a cross-interview summary report.
 
 Requirements:
@@ -61,9 +182,6 @@ Requirements:
 3. Present comprehensive synthesis results for overall project direction
 4. Suggest specific high-priority improvements
 
-Interview Transcripts:
-{formatted_input}
-
 Output Format:
 Common Trends
 - (list key trends)
@@ -75,32 +193,334 @@ Synthesis Insights
 - (overall direction)
 
 Priority Improvements
-1. (specific suggestions)
-"""
+1. (specific suggestions)"""
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
+COMPLETION_CACHE_PATH = os.environ.get(
+    "COMPLETION_CACHE_PATH", ".cache/completions.sqlite3"
+)
+EMBEDDING_CACHE_PATH = os.environ.get(
+    "EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3"
+)
+SEMANTIC_CACHE_ENABLED = os.environ.get("SEMANTIC_CACHE", "1") != "0"
+SEMANTIC_CACHE_THRESHOLD = 0.98
+SEMANTIC_CACHE_MAX_WORDS = 128
+MAX_CONCURRENT_REQUESTS = 8
+
+_completion_cache: Optional[sqlite3.Connection] = None
+_embedding_cache: Optional[sqlite3.Connection] = None
+
+
+def _get_completion_cache() -> sqlite3.Connection:
+    global _completion_cache
+    if _completion_cache is None:
+        os.makedirs(os.path.dirname(COMPLETION_CACHE_PATH) or ".", exist_ok=True)
+        _completion_cache = sqlite3.connect(COMPLETION_CACHE_PATH)
+        _completion_cache.execute("""
+CREATE TABLE IF NOT EXISTS completions (
+    key TEXT PRIMARY KEY,
+    scope TEXT,
+    embedding BLOB,
+    response TEXT
+)
+""")
+    return _completion_cache
+
+
+def _get_embedding_cache() -> sqlite3.Connection:
+    global _embedding_cache
+    if _embedding_cache is None:
+        os.makedirs(os.path.dirname(EMBEDDING_CACHE_PATH) or ".", exist_ok=True)
+        _embedding_cache = sqlite3.connect(EMBEDDING_CACHE_PATH)
+        _embedding_cache.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, embedding BLOB)"
+        )
+    return _embedding_cache
+
+
+def _to_unit(emb: np.ndarray) -> np.ndarray:
+    emb = emb.astype(np.float32)
+    norm = np.linalg.norm(emb)
+    return emb / norm if norm > 0 else emb
+
+
+def _encode_sorted(texts: List[str]) -> np.ndarray:
+    order = np.argsort([len(t) for t in texts], kind="stable")
+    embs = _get_embedder().encode(
+        [texts[i] for i in order],
+        batch_size=32,
+        normalize_embeddings=True,
+        convert_to_numpy=True,
+    )
+    return np.asarray(embs)[np.argsort(order)]
+
+
+# Every embedding handed out by cached_encode (and therefore the semantic
+# completion index) is unit-norm float32, so cosine
+# similarity is a plain dot product and callers need not re-normalize.
+def cached_encode(text: str) -> np.ndarray:
+    return cached_encode_batch([text])[0]
+
+
+def cached_encode_batch(texts: List[str]) -> np.ndarray:
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+    db = _get_embedding_cache()
+    keys = [
+        hashlib.sha256(f"{EMBEDDER_BACKEND}|{text}".encode()).hexdigest()
+        for text in texts
+    ]
+    out: List[Optional[np.ndarray]] = [None] * len(texts)
+    missing = []
+    for i, key in enumerate(keys):
+        row = db.execute(
+            "SELECT embedding FROM embeddings WHERE key = ?", (key,)
+        ).fetchone()
+        if row:
+            out[i] = _to_unit(np.frombuffer(row[0], dtype=np.float16))
+        else:
+            missing.append(i)
+    if missing:
+        embs = _encode_sorted([texts[i] for i in missing]).astype(np.float16)
+        db.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, embedding) VALUES (?, ?)",
+            [(keys[i], emb.tobytes()) for i, emb in zip(missing, embs)],
+        )
+        db.commit()
+        for i, emb in zip(missing, embs):
+            out[i] = _to_unit(emb)
+    return np.stack(out)
+
+
+class _EmbeddingStore:
+    def __init__(self):
+        self._emb_mat: Optional[np.ndarray] = None
+        self._emb_ids: Dict[str, int] = {}
+        self._keys: List[str] = []
+
+    def add(self, key: str, emb: np.ndarray) -> None:
+        row = self._emb_ids.get(key)
+        if row is None:
+            row = len(self._keys)
+            if self._emb_mat is None:
+                self._emb_mat = np.empty((16, emb.shape[0]), dtype=np.float16)
+            elif row == len(self._emb_mat):
+                self._emb_mat = np.concatenate(
+                    [self._emb_mat, np.empty_like(self._emb_mat)]
+                )
+            self._emb_ids[key] = row
+            self._keys.append(key)
+        self._emb_mat[row] = emb
+
+    def most_similar(self, query: np.ndarray) -> Tuple[Optional[str], float]:
+        if not self._keys:
+            return None, -1.0
+        sims = self._emb_mat[: len(self._keys)].astype(np.float32) @ query
+        best = int(np.argmax(sims))
+        return self._keys[best], float(sims[best])
+
+    def vector(self, key: str) -> np.ndarray:
+        return self._emb_mat[self._emb_ids[key]].astype(np.float32)
+
+
+_semantic_index: Dict[str, _EmbeddingStore] = {}
+
+
+def _load_semantic_index(scope: str) -> _EmbeddingStore:
+    if scope not in _semantic_index:
+        store = _EmbeddingStore()
+        rows = (
+            _get_completion_cache()
+            .execute(
+                "SELECT key, embedding FROM completions"
+                " WHERE scope = ? AND embedding IS NOT NULL",
+                (scope,),
+            )
+            .fetchall()
         )
-        return response.choices[0].message.content
+        for key, blob in rows:
+            store.add(key, np.frombuffer(blob, dtype=np.float32))
+        _semantic_index[scope] = store
+    return _semantic_index[scope]
+
+
+def _cached_completion(key: str) -> Optional[str]:
+    row = (
+        _get_completion_cache()
+        .execute("SELECT response FROM completions WHERE key = ?", (key,))
+        .fetchone()
+    )
+    return row[0] if row else None
+
+
+def _similar_completion(scope: str, query_embs: np.ndarray) -> Optional[str]:
+    store = _load_semantic_index(scope)
+    key, _ = store.most_similar(query_embs.ravel())
+    if key is None:
+        return None
+    per_transcript = (store.vector(key).reshape(query_embs.shape) * query_embs).sum(
+        axis=1
+    )
+    if per_transcript.min() < SEMANTIC_CACHE_THRESHOLD:
+        return None
+    return _cached_completion(key)
+
+
+def _store_completion(
+    key: str, scope: str, query_embs: Optional[np.ndarray], response: str
+) -> None:
+    db = _get_completion_cache()
+    db.execute(
+        "INSERT OR REPLACE INTO completions (key, scope, embedding, response) VALUES (?, ?, ?, ?)",
+        (key, scope, None if query_embs is None else query_embs.tobytes(), response),
+    )
+    db.commit()
+    if query_embs is not None:
+        _load_semantic_index(scope).add(key, query_embs.ravel())
+
+
+def _prepare_analysis(
+    transcripts: List[str], prompt_template: str, model: str
+) -> Tuple[str, str, str, Optional[np.ndarray], Optional[str]]:
+    formatted_input = "\n\n".join(
+        f"Interview Data {index+1}:\n{text}" for index, text in enumerate(transcripts)
+    )
+
+    if "{formatted_input}" in prompt_template:
+        prompt = prompt_template.replace("{formatted_input}", formatted_input)
+    else:
+        prompt = prompt_template + "\n\nInterview Transcripts:\n" + formatted_input
+    key = hashlib.blake2b(f"{model}|{prompt}".encode()).hexdigest()
+    scope = hashlib.blake2b(
+        f"{model}|{prompt_template}|{len(transcripts)}".encode()
+    ).hexdigest()
+    cached = _cached_completion(key)
+    if cached is not None:
+        return prompt, key, scope, None, cached
+
+    # MiniLM truncates at 256 word pieces, so texts past that point would embed
+    # identically; only match inputs whose every transcript fits the window.
+    if not (
+        SEMANTIC_CACHE_ENABLED
+        and transcripts
+        and all(len(t.split()) <= SEMANTIC_CACHE_MAX_WORDS for t in transcripts)
+    ):
+        return prompt, key, scope, None, None
+    input_embs = cached_encode_batch(transcripts)
+    return prompt, key, scope, input_embs, _similar_completion(scope, input_embs)
+
+
+def generate_cross_interview_analysis(
+    transcripts: List[str],
+    prompt_template: str = _PROMPT_PREFIX,
+    model: str = "gpt-4o",
+    stream: bool = False,
+) -> str:
+    prompt, key, scope, input_emb, cached = _prepare_analysis(
+        transcripts, prompt_template, model
+    )
+    if cached is not None:
+        if stream:
+            sys.stdout.write(cached + "\n")
+        return cached
+
+    try:
+        if stream:
+            buf = []
+            for chunk in _get_openai().chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.7,
+                stream=True,
+            ):
+                piece = (chunk.choices[0].delta.content or "") if chunk.choices else ""
+                buf.append(piece)
+                sys.stdout.write(piece)
+                sys.stdout.flush()
+            sys.stdout.write("\n")
+            content = "".join(buf)
+        else:
+            response = _get_openai().chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.7,
+            )
+            content = response.choices[0].message.content
+    except Exception as e:
+        error = f"Error: {str(e)}"
+        if stream:
+            sys.stdout.write(error + "\n")
+        return error
+
+    _store_completion(key, scope, input_emb, content)
+    return content
+
+
+async def agenerate_cross_interview_analysis(
+    aclient: AsyncOpenAI,
+    semaphore: asyncio.Semaphore,
+    transcripts: List[str],
+    prompt_template: str = _PROMPT_PREFIX,
+    model: str = "gpt-4o",
+) -> str:
+    prompt, key, scope, input_emb, cached = _prepare_analysis(
+        transcripts, prompt_template, model
+    )
+    if cached is not None:
+        return cached
+
+    try:
+        async with semaphore:
+            response = await aclient.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.7,
+            )
+        content = response.choices[0].message.content
     except Exception as e:
         return f"Error: {str(e)}"
 
+    _store_completion(key, scope, input_emb, content)
+    return content
+
+
+_TOKEN_RE = re.compile(r"[A-Za-z0-9']+")
+
+_HAS_SIMSIMD = find_spec("simsimd") is not None
+
+
+def pairwise_cosine(
+    a: np.ndarray, b: np.ndarray, assume_unit: bool = False
+) -> np.ndarray:
+    a = np.ascontiguousarray(a, dtype=np.float32)
+    b = np.ascontiguousarray(b, dtype=np.float32)
+    if _HAS_SIMSIMD:
+        import simsimd
+
+        return 1.0 - np.asarray(simsimd.cdist(a, b, metric="cosine"))
+    if assume_unit:
+        return a @ b.T
+    a_norms = np.linalg.norm(a, axis=1, keepdims=True)
+    b_norms = np.linalg.norm(b, axis=1, keepdims=True)
+    a = np.divide(a, a_norms, out=np.zeros_like(a), where=a_norms > 0)
+    b = np.divide(b, b_norms, out=np.zeros_like(b), where=b_norms > 0)
+    return a @ b.T
+
 
 def evaluate_performance(ai_output: str, expert_reference: str) -> float:
-    embeddings = embedding_model.encode([ai_output, expert_reference])
-    score = cosine_similarity([embeddings[0]], [embeddings[1]])[0][0]
-    return float(score)
+    embs = cached_encode_batch([ai_output, expert_reference])
+    return float(embs[0] @ embs[1])
+
+
+def _tok(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
 
 
 def evaluate_rouge_metrics(ai_output: str, expert_reference: str) -> Dict[str, float]:
-    ai_words = set(ai_output.lower().replace(",", "").replace(".", "").split())
-    ref_words = set(expert_reference.lower().replace(",", "").replace(".", "").split())
-    common_words = ai_words.intersection(ref_words)
-    precision = len(common_words) / len(ai_words) if ai_words else 0
-    recall = len(common_words) / len(ref_words) if ref_words else 0
+    ai_tokens = _tok(ai_output)
+    ref_counts = Counter(_tok(expert_reference))
+    overlap = overlap_count(ai_tokens, ref_counts)
+    precision = overlap / len(ai_tokens) if ai_tokens else 0
+    recall = overlap / sum(ref_counts.values()) if ref_counts else 0
     f1 = (
         2 * (precision * recall) / (precision + recall)
         if (precision + recall) > 0
@@ -113,8 +533,13 @@ def evaluate_rouge_metrics(ai_output: str, expert_reference: str) -> Dict[str, f
     }
 
 
-def comprehensive_evaluation(ai_output: str, expert_reference: str) -> Dict:
-    cosine_score = evaluate_performance(ai_output, expert_reference)
+def comprehensive_evaluation(
+    ai_output: str,
+    expert_reference: str,
+    cosine_score: Optional[float] = None,
+) -> Dict:
+    if cosine_score is None:
+        cosine_score = evaluate_performance(ai_output, expert_reference)
     rouge_metrics = evaluate_rouge_metrics(ai_output, expert_reference)
     overall_score = (cosine_score * 0.6) + (rouge_metrics["f1_score"] * 0.4)
 
@@ -142,16 +567,62 @@ def comprehensive_evaluation(ai_output: str, expert_reference: str) -> Dict:
     }
 
 
-def prompt_optimization_experiment(
+def comprehensive_evaluation_batch(pairs: List[Tuple[str, str]]) -> List[Dict]:
+    if not pairs:
+        return []
+    outputs = {text: i for i, text in enumerate(dict.fromkeys(p[0] for p in pairs))}
+    references = {text: i for i, text in enumerate(dict.fromkeys(p[1] for p in pairs))}
+    texts = list(dict.fromkeys([*outputs, *references]))
+    embs = dict(zip(texts, cached_encode_batch(texts)))
+    sims = pairwise_cosine(
+        np.stack([embs[text] for text in outputs]),
+        np.stack([embs[text] for text in references]),
+        assume_unit=True,
+    )
+    return [
+        comprehensive_evaluation(
+            ai_output,
+            expert_reference,
+            cosine_score=float(sims[outputs[ai_output], references[expert_reference]]),
+        )
+        for ai_output, expert_reference in pairs
+    ]
+
+
+async def aprompt_optimization_experiment(
     transcripts: List[str], expert_reference: str, prompt_versions: List[str]
 ) -> List[Dict]:
     results = []
+    unique_templates = list(dict.fromkeys(prompt_versions))
+    print(f"\nGenerating reports for {len(unique_templates)} prompt versions...")
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    async with AsyncOpenAI(
+        api_key=OPENAI_API_KEY, http_client=pooled_async_client()
+    ) as aclient:
+        generated = await asyncio.gather(
+            *[
+                agenerate_cross_interview_analysis(
+                    aclient, semaphore, transcripts, prompt_template
+                )
+                for prompt_template in unique_templates
+            ]
+        )
+    outputs = dict(zip(unique_templates, generated))
+    ref_emb = cached_encode(expert_reference)
+    sims = pairwise_cosine(
+        cached_encode_batch(generated), ref_emb[None, :], assume_unit=True
+    )[:, 0]
+    cosine_scores = dict(zip(unique_templates, sims))
     for idx, prompt_template in enumerate(prompt_versions):
         print(
             f"\n[Experiment {idx+1}/{len(prompt_versions)}] Testing prompt version..."
         )
-        ai_output = generate_cross_interview_analysis(transcripts)
-        evaluation = comprehensive_evaluation(ai_output, expert_reference)
+        ai_output = outputs[prompt_template]
+        evaluation = comprehensive_evaluation(
+            ai_output,
+            expert_reference,
+            cosine_score=float(cosine_scores[prompt_template]),
+        )
         results.append(
             {
                 "version": idx + 1,
@@ -165,9 +636,18 @@ def prompt_optimization_experiment(
     print(
         f"\nOptimal prompt: Version {best_result['version']} (score: {best_result['score']})"
     )
+    save_evaluation_results_batch([result["full_evaluation"] for result in results])
     return results
 
 
+def prompt_optimization_experiment(
+    transcripts: List[str], expert_reference: str, prompt_versions: List[str]
+) -> List[Dict]:
+    return asyncio.run(
+        aprompt_optimization_experiment(transcripts, expert_reference, prompt_versions)
+    )
+
+
 def connect_to_snowflake():
     try:
         import snowflake.connector
@@ -205,20 +685,8 @@ def connect_to_postgres():
         return None
 
 
-def save_evaluation_results(
-    evaluation_data: Dict, table_name: str = "llm_evaluation_log"
-):
-    try:
-        from datetime import datetime
-
-        import psycopg2
-
-        conn = connect_to_postgres()
-        if not conn:
-            return False
-        cursor = conn.cursor()
-        cursor.execute(f"""
-CREATE TABLE IF NOT EXISTS {table_name} (
+_CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS {table} (
     id SERIAL PRIMARY KEY,
     timestamp TIMESTAMP,
     cosine_similarity FLOAT,
@@ -227,30 +695,102 @@ CREATE TABLE IF NOT EXISTS {table_name} (
     grade VARCHAR(50),
     recommendation TEXT
 )
-""")
-        cursor.execute(
-            f"""
-INSERT INTO {table_name}
+"""
+
+_INSERT_SQL = """
+INSERT INTO {table}
 (timestamp,cosine_similarity,rouge_f1,overall_score,grade,recommendation)
-VALUES (%s,%s,%s,%s,%s,%s)
-""",
-            (
-                datetime.now(),
-                evaluation_data["cosine_similarity"],
-                evaluation_data["rouge_f1"],
-                evaluation_data["overall_score"],
-                evaluation_data["grade"],
-                evaluation_data["recommendation"],
-            ),
+VALUES %s
+"""
+
+_SAFE_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+_pg_pool = None
+_ready_tables = set()
+
+
+@functools.lru_cache(maxsize=None)
+def _table_sql(table_name: str) -> Tuple[str, str]:
+    if not _SAFE_NAME.match(table_name):
+        raise ValueError(f"Invalid table name: {table_name!r}")
+    return (
+        _CREATE_TABLE_SQL.format(table=table_name),
+        _INSERT_SQL.format(table=table_name),
+    )
+
+
+def _get_pg_pool():
+    global _pg_pool
+    if _pg_pool is None:
+        from psycopg2.pool import ThreadedConnectionPool
+
+        _pg_pool = ThreadedConnectionPool(
+            1,
+            8,
+            host=os.environ.get("POSTGRES_HOST"),
+            port=int(os.environ.get("POSTGRES_PORT", 5432)),
+            database=os.environ.get("POSTGRES_DB"),
+            user=os.environ.get("POSTGRES_USER"),
+            password=os.environ.get("POSTGRES_PASSWORD"),
         )
+    return _pg_pool
+
+
+def save_evaluation_results(
+    evaluation_data: Dict, table_name: str = "llm_evaluation_log"
+):
+    return save_evaluation_results_batch([evaluation_data], table_name)
+
+
+def save_evaluation_results_batch(
+    rows: List[Dict], table_name: str = "llm_evaluation_log"
+):
+    from datetime import datetime
+
+    try:
+        create_sql, insert_sql = _table_sql(table_name)
+    except ValueError as e:
+        print(f"Save failed: {str(e)}")
+        return False
+    try:
+        from psycopg2.extras import execute_values
+
+        pool = _get_pg_pool()
+        conn = pool.getconn()
+    except Exception as e:
+        print(f"PostgreSQL connection failed: {str(e)}")
+        return False
+    now = datetime.now()
+    values = [
+        (
+            now,
+            row["cosine_similarity"],
+            row["rouge_f1"],
+            row["overall_score"],
+            row["grade"],
+            row["recommendation"],
+        )
+        for row in rows
+    ]
+    broken = False
+    try:
+        with conn.cursor() as cursor:
+            if table_name not in _ready_tables:
+                cursor.execute(create_sql)
+            execute_values(cursor, insert_sql, values, page_size=500)
         conn.commit()
-        cursor.close()
-        conn.close()
-        print(f"Results saved to: {table_name}")
+        _ready_tables.add(table_name)
+        print(f"Results saved to: {table_name} ({len(values)} rows)")
         return True
     except Exception as e:
+        try:
+            conn.rollback()
+        except Exception:
+            broken = True
         print(f"Save failed: {str(e)}")
         return False
+    finally:
+        pool.putconn(conn, close=broken or bool(conn.closed))
 
 
 def main_demo():
@@ -271,8 +811,7 @@ Balancing security and usability is the core challenge for the next project.
 """
 
     print("\n[STEP 1] Performing cross-interview analysis...\n")
-    ai_report = generate_cross_interview_analysis(interview_data)
-    print(ai_report)
+    ai_report = generate_cross_interview_analysis(interview_data, stream=True)
 
     print("\n" + "=" * 70)
     print("[STEP 2] AI Generated Report Performance Evaluation")